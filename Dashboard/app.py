@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import json
-import folium
+import duckdb
+from concurrent.futures import ThreadPoolExecutor
 import plotly.express as px
-from streamlit_folium import st_folium
+from preprocess import ORDERS_FULL_PATH, build_orders_full, is_orders_full_stale
 
 # PATH CONFIG
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,6 +15,10 @@ GEO_DIR = os.path.join(BASE_DIR, "geo")
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 
 # CONFIG
+# Batas entri per fungsi cache agar memori tidak tumbuh tanpa batas
+# saat pengguna mencoba banyak periode
+CACHE_MAX_ENTRIES = 16
+
 st.set_page_config(
     page_title="Pioneer Market Analytics",
     layout="wide"
@@ -20,37 +26,415 @@ st.set_page_config(
 st.title("Pioneer Market Analytics")
 
 # LOAD DATA
-@st.cache_data
+# orders_full dibangun lewat preprocess.py (merge + sort per tanggal), otomatis
+# dibangun ulang jika belum ada atau lebih lama dari CSV sumbernya
+# cache_resource: objek yang sama dipakai ulang tiap rerun (read-only, tanpa copy)
+@st.cache_resource
 def load_data():
-    customers = pd.read_csv(os.path.join(DATA_DIR, "customers_dataset.csv"))
-    orders = pd.read_csv(os.path.join(DATA_DIR, "orders_dataset.csv"))
-    order_items = pd.read_csv(os.path.join(DATA_DIR, "order_items_dataset.csv"))
-    products = pd.read_csv(os.path.join(DATA_DIR, "products_dataset.csv"))
+    if is_orders_full_stale():
+        build_orders_full()
+
+    orders_full = pd.read_parquet(
+        ORDERS_FULL_PATH,
+        engine="pyarrow", dtype_backend="pyarrow"
+    )
 
-    orders['order_purchase_timestamp'] = pd.to_datetime(
-        orders['order_purchase_timestamp']
+    # Timestamp sudah bertipe, cukup dipindah ke datetime64 NumPy untuk .dt
+    orders_full['order_purchase_timestamp'] = (
+        orders_full['order_purchase_timestamp'].astype('datetime64[ns]')
     )
 
-    return customers, orders, order_items, products
+    # Satu baris per order untuk hitungan order/pelanggan/temporal, sehingga
+    # tidak ikut terkali jumlah item per order
+    orders_level = orders_full.drop_duplicates('order_id')[[
+        'order_id', 'order_purchase_timestamp', 'customer_unique_id', 'customer_state'
+    ]]
+
+    return orders_full, orders_level
 
-customers, orders, order_items, products = load_data()
+orders_full, orders_level = load_data()
+
+# DUCKDB CONNECTION
+# Agregasi kategori & wilayah dijalankan DuckDB langsung di atas Parquet
+@st.cache_resource
+def load_duckdb():
+    con = duckdb.connect()
+    orders_full_path = ORDERS_FULL_PATH.replace("'", "''")
+    con.execute(
+        f"CREATE VIEW orders_full AS SELECT * FROM read_parquet('{orders_full_path}')"
+    )
+    return con
+
+def query_period(sql, start_date, end_date):
+    # Cursor per query: koneksi dibagi lintas sesi Streamlit
+    con = load_duckdb().cursor()
+    period_start = pd.Timestamp(start_date)
+    period_end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    return con.execute(sql, [period_start, period_end]).df()
 
 # LOAD GEOJSON
-with open(os.path.join(GEO_DIR, "br_states.geojson"), encoding="utf-8") as f:
-    brazil_geo = json.load(f)
+@st.cache_resource
+def load_geojson():
+    with open(os.path.join(GEO_DIR, "br_states.geojson"), encoding="utf-8") as f:
+        return json.load(f)
+
+# FILTER HELPER
+def filter_orders(orders_full, start_date, end_date):
+    # Bandingkan langsung di kolom datetime64 (int64 ns), tanpa objek date per baris
+    purchase_ts = orders_full['order_purchase_timestamp'].values
+    period_start = np.datetime64(start_date)
+    period_end = np.datetime64(end_date) + np.timedelta64(1, 'D')
+
+    return orders_full[
+        (purchase_ts >= period_start) &
+        (purchase_ts < period_end)
+    ]
 
-# DATA PREPARATION
-orders_customers = orders.merge(customers, on='customer_id', how='left')
+# Skor kuartil 1-4: rank 'first' dari satu argsort stabil, lalu dibagi ke
+# titik potong kuartil dengan np.searchsorted (pengganti rank + pd.qcut).
+# Rank dipakai, bukan nilai mentah, agar nilai kembar (mis. frequency = 1)
+# tetap tersebar rata ke empat kuartil seperti sebelumnya
+def quartile_score(values):
+    ranks = np.empty(len(values), dtype='int64')
+    ranks[np.argsort(values, kind='stable')] = np.arange(1, len(values) + 1)
+
+    cut_points = np.quantile(ranks, [0.25, 0.5, 0.75])
+    return np.searchsorted(cut_points, ranks, side='left') + 1
+
+# Reduksi RFM per pelanggan dalam satu lintasan atas array yang diurutkan per
+# pelanggan: batas grup dari np.searchsorted, lalu max/sum lewat ufunc.reduceat.
+# Kode pelanggan di-factorize terurut agar urutan baris sama dengan groupby;
+# order_id ikut di-factorize agar hitungan order unik berjalan di integer
+def reduce_rfm(filtered_orders, snapshot_date):
+    customer_codes, customer_ids = pd.factorize(
+        filtered_orders['customer_unique_id'], sort=True
+    )
+    n_customers = len(customer_ids)
+    order_codes, order_ids = pd.factorize(filtered_orders['order_id'])
+
+    row_order = np.argsort(customer_codes, kind='stable')
+    customer_codes = customer_codes[row_order]
+    group_starts = np.searchsorted(customer_codes, np.arange(n_customers))
+
+    purchase_ts = filtered_orders['order_purchase_timestamp'].values[row_order]
+    revenue = filtered_orders['revenue'].to_numpy(dtype='float64', na_value=0.0)[row_order]
+    order_codes = order_codes[row_order].astype('int64')
+
+    last_purchase = np.maximum.reduceat(purchase_ts, group_starts)
+    monetary = np.add.reduceat(revenue, group_starts)
+
+    # Pasangan (pelanggan, order) unik -> jumlah order per pelanggan
+    n_orders = len(order_ids)
+    customer_orders = np.unique(customer_codes * n_orders + order_codes)
+    frequency = np.bincount(customer_orders // n_orders, minlength=n_customers)
+
+    recency = (np.datetime64(snapshot_date) - last_purchase).astype('timedelta64[D]')
+
+    return pd.DataFrame({
+        'customer_unique_id': customer_ids,
+        'recency': recency.astype('int64'),
+        'frequency': frequency,
+        'monetary': monetary
+    })
+
+# CACHED AGGREGATIONS
+# Di-cache per periode agar rerun tanpa perubahan tanggal tidak menghitung ulang
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def compute_rfm(start_date, end_date):
+    orders_full, _ = load_data()
+    filtered_orders = filter_orders(orders_full, start_date, end_date)
+
+    # Build RFM Table
+    snapshot_date = filtered_orders['order_purchase_timestamp'].max() + pd.Timedelta(days=1)
+
+    rfm = reduce_rfm(filtered_orders, snapshot_date)
+
+    rfm['R_score'] = quartile_score(rfm['recency'].values)
+    rfm['F_score'] = quartile_score(rfm['frequency'].values)
+    rfm['M_score'] = quartile_score(rfm['monetary'].values)
+
+    r = rfm['R_score'].values
+    f = rfm['F_score'].values
+    m = rfm['M_score'].values
+
+    segment_conditions = [
+        (r >= 3) & (f >= 3) & (m >= 3),
+        (r >= 3) & (f >= 2),
+        (r >= 3),
+        (r == 2)
+    ]
+    segment_labels = [
+        'Champions',
+        'Loyal Customers',
+        'Potential Loyalists',
+        'Need Attention',
+        'Lost Customers'
+    ]
 
-# BUILD MASTER DATASET
-orders_full = (
-    orders_customers
-    .merge(order_items, on='order_id', how='left')
-    .merge(products, on='product_id', how='left')
-)
+    # Segment disimpan sebagai categorical langsung dari kode np.select
+    segment_codes = np.select(segment_conditions, [0, 1, 2, 3], default=4)
+    rfm['Segment'] = pd.Categorical.from_codes(segment_codes, categories=segment_labels)
+
+    # Hanya kolom yang dibaca tab, customer_unique_id tidak ikut di-pickle
+    return rfm[['recency', 'frequency', 'monetary', 'Segment']]
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def compute_temporal(start_date, end_date):
+    _, orders_level = load_data()
+    filtered_order_level = filter_orders(orders_level, start_date, end_date)
+
+    # Satu kali ekstraksi timestamp, semua hitungan lewat np.bincount
+    purchase_hour = filtered_order_level['order_purchase_timestamp'].values.astype('datetime64[h]')
+    hour = purchase_hour.astype('int64') % 24
+    days = purchase_hour.astype('datetime64[D]').astype('int64')
+    dayofweek = (days + 3) % 7  # 1970-01-01 adalah Kamis, Senin = 0
+
+    # Daily Transaction Volume
+    daily_counts = np.bincount(dayofweek, minlength=7)
+    daily = pd.DataFrame({
+        'Day': ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'],
+        'Total Transactions': daily_counts
+    })
+
+    # Hourly Transaction Distribution
+    hourly = pd.DataFrame({
+        'Hour': np.arange(24),
+        'Total Transactions': np.bincount(hour, minlength=24)
+    })
+
+    # Monthly Transaction Trend
+    months, month_counts = np.unique(
+        purchase_hour.astype('datetime64[M]'), return_counts=True
+    )
+    monthly = pd.DataFrame({
+        'Month': np.datetime_as_string(months, unit='M'),
+        'Total Transactions': month_counts
+    })
+
+    # Weekend vs Weekday
+    weekend = daily_counts[5:].sum()
+    weekday = daily_counts[:5].sum()
+
+    return daily, hourly, monthly, weekend, weekday
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def compute_category_summary(start_date, end_date):
+    category_summary = query_period("""
+        SELECT
+            product_category_name,
+            COALESCE(SUM(revenue), 0) AS revenue,
+            COUNT(DISTINCT order_id) AS total_orders,
+            COUNT(DISTINCT product_id) AS product_count
+        FROM orders_full
+        WHERE order_purchase_timestamp >= ?
+          AND order_purchase_timestamp < ?
+          AND product_category_name IS NOT NULL
+        GROUP BY product_category_name
+        ORDER BY revenue DESC, product_category_name
+    """, start_date, end_date)
+
+    category_summary['AOV'] = category_summary['revenue'] / category_summary['total_orders']
+
+    return category_summary
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def compute_geo_summary(start_date, end_date):
+    geo_summary = query_period("""
+        SELECT
+            customer_state,
+            COALESCE(SUM(revenue), 0) AS total_revenue,
+            COUNT(DISTINCT order_id) AS total_orders,
+            COUNT(DISTINCT customer_unique_id) AS total_customers
+        FROM orders_full
+        WHERE order_purchase_timestamp >= ?
+          AND order_purchase_timestamp < ?
+        GROUP BY customer_state
+        ORDER BY total_revenue DESC, customer_state
+    """, start_date, end_date)
+
+    return geo_summary
+
+# CACHED CHARTS
+# Figure Plotly tiap tab dibangun sekali per periode dan di-cache sebagai Figure,
+# sehingga pindah tab atau rerun lain hanya merender ulang
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def build_segmentation_charts(start_date, end_date):
+    rfm = compute_rfm(start_date, end_date)
+
+    fig_r = px.histogram(
+        rfm, x='recency',
+        title="Recency Distribution",
+        nbins=30
+    )
+    fig_f = px.histogram(
+        rfm, x='frequency',
+        title="Frequency Distribution",
+        nbins=30
+    )
+    fig_m = px.histogram(
+        rfm, x='monetary',
+        title="Monetary Distribution",
+        nbins=30
+    )
+
+    # observed=True: segmen kosong tidak ikut tampil sebagai bar nol
+    segment_count = (
+        rfm.groupby('Segment', observed=True)
+        .size()
+        .sort_values(ascending=False)
+        .reset_index(name='Total Customers')
+    )
+
+    fig_segment = px.bar(
+        segment_count,
+        x='Segment',
+        y='Total Customers',
+        text='Total Customers'
+    )
+
+    segment_revenue = (
+        rfm.groupby('Segment', observed=True, sort=False)['monetary']
+        .sum()
+        .reset_index()
+    )
+
+    fig_revenue = px.pie(
+        segment_revenue,
+        names='Segment',
+        values='monetary',
+        hole=0.4
+    )
 
-# Revenue definition
-orders_full['revenue'] = orders_full['price']
+    return {
+        'recency': fig_r,
+        'frequency': fig_f,
+        'monetary': fig_m,
+        'segment': fig_segment,
+        'revenue': fig_revenue
+    }
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def build_temporal_charts(start_date, end_date):
+    daily, hourly, monthly, _, _ = compute_temporal(start_date, end_date)
+
+    fig_daily = px.line(
+        daily,
+        x='Day',
+        y='Total Transactions',
+        markers=True,
+        title=None
+    )
+    fig_hourly = px.bar(
+        hourly,
+        x='Hour',
+        y='Total Transactions',
+        title=None
+    )
+    fig_monthly = px.line(
+        monthly,
+        x='Month',
+        y='Total Transactions',
+        markers=True,
+        title=None
+    )
+
+    return {
+        'daily': fig_daily,
+        'hourly': fig_hourly,
+        'monthly': fig_monthly
+    }
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def build_category_charts(start_date, end_date):
+    # Sudah terurut revenue menurun dari query
+    category_summary = compute_category_summary(start_date, end_date)
+
+    fig_rev = px.bar(
+        category_summary,
+        x='revenue',
+        y='product_category_name',
+        orientation='h'
+    )
+    fig_count = px.bar(
+        category_summary.sort_values('product_count', ascending=False),
+        x='product_count',
+        y='product_category_name'
+    )
+    fig_aov = px.bar(
+        category_summary.sort_values('AOV', ascending=False),
+        x='AOV',
+        y='product_category_name',
+        orientation='h'
+    )
+
+    return {
+        'revenue': fig_rev,
+        'product_count': fig_count,
+        'aov': fig_aov
+    }
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def build_geo_charts(start_date, end_date):
+    geo_summary = compute_geo_summary(start_date, end_date)
+
+    # Revenue per State (Choropleth Map)
+    map_data = geo_summary[['customer_state', 'total_revenue']]
+
+    fig_map = px.choropleth_map(
+        map_data,
+        geojson=load_geojson(),
+        locations='customer_state',
+        featureidkey='properties.sigla',
+        color='total_revenue',
+        color_continuous_scale='YlGnBu',
+        map_style='carto-positron',
+        center={'lat': -14.2350, 'lon': -51.9253},
+        zoom=3,
+        opacity=0.7,
+        labels={'total_revenue': 'Total Revenue per State'},
+        height=500
+    )
+    fig_map.update_layout(margin={'r': 0, 't': 0, 'l': 0, 'b': 0})
+
+    top_states_orders = geo_summary.sort_values(
+        'total_orders', ascending=True
+    )
+
+    fig_orders = px.bar(
+        top_states_orders,
+        x='total_orders',
+        y='customer_state',
+        orientation='h',
+        labels={
+            'total_orders': 'Total Orders',
+            'customer_state': 'State'
+        },
+        title="Order Volume by State"
+    )
+
+    # Customer Density per State
+    # (Proxy karena tidak ada koordinat lat-long)
+    top_states_customers = geo_summary.sort_values(
+        'total_customers', ascending=True
+    )
+
+    fig_customers = px.bar(
+        top_states_customers,
+        x='total_customers',
+        y='customer_state',
+        orientation='h',
+        labels={
+            'total_customers': 'Number of Customers',
+            'customer_state': 'State'
+        },
+        title="Customer Density by State"
+    )
+
+    return {
+        'map': fig_map,
+        'orders': fig_orders,
+        'customers': fig_customers
+    }
 
 # SIDEBAR
 logo_path = os.path.join(ASSETS_DIR, "logo.png")
@@ -81,10 +465,13 @@ with st.sidebar:
 
 
 # FILTER DATA 
-filtered_orders = orders_full[
-    (orders_full['order_purchase_timestamp'].dt.date >= start_date) &
-    (orders_full['order_purchase_timestamp'].dt.date <= end_date)
-]
+filtered_orders = filter_orders(orders_full, start_date, end_date)
+
+filtered_order_level = filter_orders(orders_level, start_date, end_date)
+
+# Hitung order & pelanggan unik sekali per rerun, dipakai caption dan KPI
+order_count = len(filtered_order_level)
+customer_count = filtered_order_level['customer_unique_id'].nunique()
 
 if filtered_orders.empty:
     st.info(
@@ -93,23 +480,35 @@ if filtered_orders.empty:
 else:
     st.caption(
         f"Analisis mencakup periode {start_date} sampai {end_date} "
-        f"dengan volume transaksi sebesar {filtered_orders['order_id'].nunique():,} order"
+        f"dengan volume transaksi sebesar {order_count:,} order"
     )
 
-# KPI SUMMARY
+# PARALLEL AGGREGATION
+# Empat agregasi saling independen; kerja C-level (NumPy/Arrow/DuckDB)
+# melepas GIL sehingga bisa dihitung paralel pada periode baru
 if not filtered_orders.empty:
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        rfm_future = executor.submit(compute_rfm, start_date, end_date)
+        temporal_future = executor.submit(compute_temporal, start_date, end_date)
+        category_future = executor.submit(compute_category_summary, start_date, end_date)
+        geo_future = executor.submit(compute_geo_summary, start_date, end_date)
+
+        rfm = rfm_future.result()
+        daily, hourly, monthly, weekend, weekday = temporal_future.result()
+        category_summary = category_future.result()
+        geo_summary = geo_future.result()
 
-    order_items = filtered_orders.merge(order_items, on='order_id', how='left')
-    order_items['revenue'] = order_items['price_x'].fillna(0)
+# KPI SUMMARY
+if not filtered_orders.empty:
 
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.metric("Total Revenue", f"R$ {order_items['revenue'].sum():,.2f}")
+        st.metric("Total Revenue", f"R$ {filtered_orders['revenue'].sum():,.2f}")
     with col2:
-        st.metric("Total Orders", filtered_orders['order_id'].nunique())
+        st.metric("Total Orders", order_count)
     with col3:
-        st.metric("Total Customers", filtered_orders['customer_unique_id'].nunique())
+        st.metric("Total Customers", customer_count)
 
 st.markdown("<br><br>", unsafe_allow_html=True)
 
@@ -142,37 +541,7 @@ with tab1:
 
     if not filtered_orders.empty:
 
-        # Build RFM Table
-        snapshot_date = filtered_orders['order_purchase_timestamp'].max() + pd.Timedelta(days=1)
-
-        rfm = (
-            order_items
-            .groupby('customer_unique_id')
-            .agg(
-                recency=('order_purchase_timestamp', lambda x: (snapshot_date - x.max()).days),
-                frequency=('order_id', 'nunique'),
-                monetary=('revenue', 'sum')
-            )
-            .reset_index()
-        )
-
-        rfm['R_score'] = pd.qcut(rfm['recency'].rank(method='first'), 4, labels=False) + 1
-        rfm['F_score'] = pd.qcut(rfm['frequency'].rank(method='first'), 4, labels=False) + 1
-        rfm['M_score'] = pd.qcut(rfm['monetary'].rank(method='first'), 4, labels=False) + 1
-
-        def rfm_segment(row):
-            if row['R_score'] >= 3 and row['F_score'] >= 3 and row['M_score'] >= 3:
-                return 'Champions'
-            elif row['R_score'] >= 3 and row['F_score'] >= 2:
-                return 'Loyal Customers'
-            elif row['R_score'] >= 3:
-                return 'Potential Loyalists'
-            elif row['R_score'] == 2:
-                return 'Need Attention'
-            else:
-                return 'Lost Customers'
-
-        rfm['Segment'] = rfm.apply(rfm_segment, axis=1)
+        charts = build_segmentation_charts(start_date, end_date)
 
         # 1. RFM Score Distribution
         st.markdown("### Distribution of RFM Scores")
@@ -180,63 +549,23 @@ with tab1:
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            fig_r = px.histogram(
-                rfm, x='recency',
-                title="Recency Distribution",
-                nbins=30
-            )
-            st.plotly_chart(fig_r, use_container_width=True)
+            st.plotly_chart(charts['recency'], use_container_width=True)
 
         with col2:
-            fig_f = px.histogram(
-                rfm, x='frequency',
-                title="Frequency Distribution",
-                nbins=30
-            )
-            st.plotly_chart(fig_f, use_container_width=True)
+            st.plotly_chart(charts['frequency'], use_container_width=True)
 
         with col3:
-            fig_m = px.histogram(
-                rfm, x='monetary',
-                title="Monetary Distribution",
-                nbins=30
-            )
-            st.plotly_chart(fig_m, use_container_width=True)
+            st.plotly_chart(charts['monetary'], use_container_width=True)
 
         # 2. Customer Segment Distribution
         st.markdown("### Customer Segment Distribution")
 
-        segment_count = (
-            rfm['Segment']
-            .value_counts()
-            .reset_index()
-        )
-        segment_count.columns = ['Segment', 'Total Customers']
-
-        fig_segment = px.bar(
-            segment_count,
-            x='Segment',
-            y='Total Customers',
-            text='Total Customers'
-        )
-        st.plotly_chart(fig_segment, use_container_width=True)
+        st.plotly_chart(charts['segment'], use_container_width=True)
 
         # 3. Revenue Contribution by Segment
         st.markdown("### Revenue Contribution by Segment")
 
-        segment_revenue = (
-            rfm.groupby('Segment')['monetary']
-            .sum()
-            .reset_index()
-        )
-
-        fig_revenue = px.pie(
-            segment_revenue,
-            names='Segment',
-            values='monetary',
-            hole=0.4
-        )
-        st.plotly_chart(fig_revenue, use_container_width=True)
+        st.plotly_chart(charts['revenue'], use_container_width=True)
 
     else:
         st.info("Data tidak tersedia untuk analisis segmentasi.")
@@ -249,9 +578,9 @@ with tab1:
     total_revenue = rfm['monetary'].sum()
 
     segment_summary = (
-        rfm.groupby('Segment')
+        rfm.groupby('Segment', observed=True, sort=False)
         .agg(
-            customers=('customer_unique_id', 'count'),
+            customers=('monetary', 'size'),
             revenue=('monetary', 'sum')
         )
         .reset_index()
@@ -262,7 +591,7 @@ with tab1:
     segment_summary['revenue_pct'] = segment_summary['revenue'] / total_revenue * 100
 
     # Dominant Revenue Segment
-    top_segment = segment_summary.sort_values('revenue', ascending=False).iloc[0]
+    top_segment = segment_summary.loc[segment_summary['revenue'].idxmax()]
 
     st.success(
         f"**Revenue Concentration**: "
@@ -302,65 +631,22 @@ with tab2:
 
     if not filtered_orders.empty:
 
+        charts = build_temporal_charts(start_date, end_date)
+
         # 1. Daily Transaction Volume
         st.markdown("### Daily Transaction Volume (Day of Week)")
 
-        daily = (
-            filtered_orders
-            .groupby(filtered_orders['order_purchase_timestamp'].dt.day_name())
-            .size()
-            .reindex(['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'])
-            .reset_index(name='Total Transactions')
-        )
-        daily.columns = ['Day', 'Total Transactions']
-
-        fig_daily = px.line(
-            daily,
-            x='Day',
-            y='Total Transactions',
-            markers=True,
-            title=None
-        )
-        st.plotly_chart(fig_daily, use_container_width=True)
+        st.plotly_chart(charts['daily'], use_container_width=True)
 
         # 2. Hourly Transaction Distribution
         st.markdown("### Hourly Transaction Distribution")
 
-        hourly = (
-            filtered_orders
-            .groupby(filtered_orders['order_purchase_timestamp'].dt.hour)
-            .size()
-            .reset_index(name='Total Transactions')
-        )
-        hourly.columns = ['Hour', 'Total Transactions']
-
-        fig_hourly = px.bar(
-            hourly,
-            x='Hour',
-            y='Total Transactions',
-            title=None
-        )
-        st.plotly_chart(fig_hourly, use_container_width=True)
+        st.plotly_chart(charts['hourly'], use_container_width=True)
 
         # 3. Monthly Transaction Trend
         st.markdown("### Monthly Transaction Trend")
 
-        monthly = (
-            filtered_orders
-            .groupby(filtered_orders['order_purchase_timestamp'].dt.to_period('M'))
-            .size()
-            .reset_index(name='Total Transactions')
-        )
-        monthly['Month'] = monthly['order_purchase_timestamp'].astype(str)
-
-        fig_monthly = px.line(
-            monthly,
-            x='Month',
-            y='Total Transactions',
-            markers=True,
-            title=None
-        )
-        st.plotly_chart(fig_monthly, use_container_width=True)
+        st.plotly_chart(charts['monthly'], use_container_width=True)
 
     else:
         st.info("Tidak ada data untuk analisis temporal.")
@@ -370,55 +656,26 @@ with tab2:
     st.markdown("### Key Insights")
 
     # Daily Insight
-    daily_summary = (
-        filtered_orders
-        .groupby(filtered_orders['order_purchase_timestamp'].dt.day_name())
-        .size()
-        .reindex(['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'])
-        .reset_index(name='Total Transactions')
-    )
-
-    peak_day = daily_summary.loc[daily_summary['Total Transactions'].idxmax()]
+    peak_day = daily.loc[daily['Total Transactions'].idxmax()]
 
     st.success(
         f"**Peak Transaction Day**: "
-        f"Hari dengan volume transaksi tertinggi adalah **{peak_day['order_purchase_timestamp']}**, "
+        f"Hari dengan volume transaksi tertinggi adalah **{peak_day['Day']}**, "
         f"dengan total **{peak_day['Total Transactions']:,} transaksi**. "
         f"Hal ini menunjukkan potensi optimalisasi promosi dan kesiapan operasional pada hari tersebut."
     )
 
     # Hourly Insight
-    hourly_summary = (
-        filtered_orders
-        .groupby(filtered_orders['order_purchase_timestamp'].dt.hour)
-        .size()
-        .reset_index(name='Total Transactions')
-    )
-
-    peak_hour = hourly_summary.loc[hourly_summary['Total Transactions'].idxmax()]
+    peak_hour = hourly.loc[hourly['Total Transactions'].idxmax()]
 
     st.info(
         f"**Peak Operating Hour**: "
-        f"Jam paling sibuk terjadi pada **pukul {int(peak_hour['order_purchase_timestamp']):02d}.00**, "
+        f"Jam paling sibuk terjadi pada **pukul {int(peak_hour['Hour']):02d}.00**, "
         f"dengan **{peak_hour['Total Transactions']:,} transaksi**. "
         f"Periode ini krusial untuk menjaga performa sistem, logistik, dan customer support."
     )
 
     # Weekend vs Weekday Insight
-    filtered_orders['day_type'] = filtered_orders['order_purchase_timestamp'].dt.dayofweek.apply(
-        lambda x: 'Weekend' if x >= 5 else 'Weekday'
-    )
-
-    day_type_summary = (
-        filtered_orders
-        .groupby('day_type')
-        .size()
-        .reset_index(name='Total Transactions')
-    )
-
-    weekend = day_type_summary[day_type_summary['day_type'] == 'Weekend']['Total Transactions'].values[0]
-    weekday = day_type_summary[day_type_summary['day_type'] == 'Weekday']['Total Transactions'].values[0]
-
     if weekend > weekday:
         st.warning(
             f"**Weekend-Dominant Behavior**: "
@@ -433,17 +690,8 @@ with tab2:
         )
 
     # Monthly Trend Insight
-    monthly_summary = (
-        filtered_orders
-        .groupby(filtered_orders['order_purchase_timestamp'].dt.to_period('M'))
-        .size()
-        .reset_index(name='Total Transactions')
-    )
-
-    monthly_summary['Month'] = monthly_summary['order_purchase_timestamp'].astype(str)
-
-    if monthly_summary.shape[0] >= 2:
-        trend_diff = monthly_summary.iloc[-1]['Total Transactions'] - monthly_summary.iloc[-2]['Total Transactions']
+    if monthly.shape[0] >= 2:
+        trend_diff = monthly.iloc[-1]['Total Transactions'] - monthly.iloc[-2]['Total Transactions']
 
         if trend_diff > 0:
             st.success(
@@ -461,21 +709,10 @@ with tab2:
 # TAB 3: CATEGORY OVERVIEW
 with tab3:
 
-    if not orders_full.empty:
+    if not filtered_orders.empty:
 
         # DATA PREP
-        category_summary = (
-            orders_full
-            .groupby('product_category_name')
-            .agg(
-                revenue=('revenue', 'sum'),
-                total_orders=('order_id', 'nunique'),
-                product_count=('product_id', 'nunique')
-            )
-            .reset_index()
-        )
-
-        category_summary['AOV'] = category_summary['revenue'] / category_summary['total_orders']
+        charts = build_category_charts(start_date, end_date)
 
         # ROW 1
         col1, col2 = st.columns(2)
@@ -484,24 +721,13 @@ with tab3:
         with col1:
             st.markdown("### Revenue by Product Category")
 
-            fig_rev = px.bar(
-                category_summary.sort_values('revenue', ascending=False),
-                x='revenue',
-                y='product_category_name',
-                orientation='h'
-            )
-            st.plotly_chart(fig_rev, use_container_width=True)
+            st.plotly_chart(charts['revenue'], use_container_width=True)
 
         # Product Count per Category
         with col2:
             st.markdown("### Product Count by Category")
 
-            fig_count = px.bar(
-                category_summary.sort_values('product_count', ascending=False),
-                x='product_count',
-                y='product_category_name'
-            )
-            st.plotly_chart(fig_count, use_container_width=True)
+            st.plotly_chart(charts['product_count'], use_container_width=True)
 
         # ROW 2
         col3, col4 = st.columns(2)
@@ -510,28 +736,15 @@ with tab3:
         with col3:
             st.markdown("### Average Order Value (AOV) by Category")
 
-            fig_aov = px.bar(
-                category_summary.sort_values('AOV', ascending=False),
-                x='AOV',
-                y='product_category_name',
-                orientation='h'
-            )
-            st.plotly_chart(fig_aov, use_container_width=True)
+            st.plotly_chart(charts['aov'], use_container_width=True)
 
         # Top Products
         with col4:
             st.markdown("### Top 10 Products by Revenue")
 
             top_products = (
-                orders_full
-                .groupby('product_category_name')
-                .agg(
-                    revenue=('revenue', 'sum'),
-                    total_orders=('order_id', 'nunique')
-                )
-                .sort_values('revenue', ascending=False)
+                category_summary[['product_category_name', 'revenue', 'total_orders']]
                 .head(10)
-                .reset_index()
             )
 
             st.dataframe(
@@ -552,7 +765,7 @@ with tab3:
     category_summary['revenue_pct'] = category_summary['revenue'] / total_revenue * 100
 
     # Revenue Dominance
-    top_cat = category_summary.sort_values('revenue', ascending=False).iloc[0]
+    top_cat = category_summary.loc[category_summary['revenue'].idxmax()]
 
     st.success(
         f"**Revenue Driver**: "
@@ -562,7 +775,7 @@ with tab3:
     )
 
     # Diversification Insight
-    low_product_cat = category_summary.sort_values('product_count').iloc[0]
+    low_product_cat = category_summary.loc[category_summary['product_count'].idxmin()]
 
     st.warning(
         f"**Portfolio Concentration**: "
@@ -571,7 +784,7 @@ with tab3:
     )
 
     # High Value Category
-    high_aov_cat = category_summary.sort_values('AOV', ascending=False).iloc[0]
+    high_aov_cat = category_summary.loc[category_summary['AOV'].idxmax()]
 
     st.info(
         f"**High-Value Transactions**: "
@@ -587,85 +800,23 @@ with tab4:
 
     
         # DATA PREPARATION
-        geo_summary = (
-            filtered_orders
-            .groupby('customer_state', as_index=False)
-            .agg(
-                total_revenue=('revenue', 'sum'),
-                total_orders=('order_id', 'nunique'),
-                total_customers=('customer_unique_id', 'nunique')
-            )
-        )
+        charts = build_geo_charts(start_date, end_date)
 
         # Revenue per State (Choropleth Map)
         st.markdown("### Revenue Distribution by State")
 
-        map_data = geo_summary[['customer_state', 'total_revenue']]
-
-        # Base map Brazil
-        m = folium.Map(
-            location=[-14.2350, -51.9253],
-            zoom_start=4,
-            tiles="cartodbpositron"
-        )
-
-        # Choropleth layer
-        folium.Choropleth(
-            geo_data=brazil_geo,
-            data=map_data,
-            columns=["customer_state", "total_revenue"],
-            key_on="feature.properties.sigla",
-            fill_color="YlGnBu",
-            fill_opacity=0.7,
-            line_opacity=0.3,
-            legend_name="Total Revenue per State"
-        ).add_to(m)
-
-        st_folium(m, width=900, height=500)
+        st.plotly_chart(charts['map'], use_container_width=True)
 
         # Top States by Orders (Horizontal Bar Chart)
         st.markdown("### Top States by Number of Orders")
 
-        top_states_orders = geo_summary.sort_values(
-            'total_orders', ascending=True
-        )
-
-        fig_orders = px.bar(
-            top_states_orders.sort_values('total_orders', ascending=True),
-            x='total_orders',
-            y='customer_state',
-            orientation='h',
-            labels={
-                'total_orders': 'Total Orders',
-                'customer_state': 'State'
-            },
-        title="Order Volume by State"
-        )
-
-        st.plotly_chart(fig_orders, use_container_width=True)
+        st.plotly_chart(charts['orders'], use_container_width=True)
 
 
         # Customer Density per State
-        # (Proxy karena tidak ada koordinat lat-long)
         st.markdown("### Customer Distribution by State")
 
-        top_states_customers = geo_summary.sort_values(
-            'total_customers', ascending=True
-        )
-
-        fig_customers = px.bar(
-            top_states_customers,
-            x='total_customers',
-            y='customer_state',
-            orientation='h',
-            labels={
-                'total_customers': 'Number of Customers',
-                'customer_state': 'State'
-            },
-            title="Customer Density by State"
-        )
-
-        st.plotly_chart(fig_customers, use_container_width=True)
+        st.plotly_chart(charts['customers'], use_container_width=True)
 
         # Regional KPI Table
         st.markdown("### Regional Performance Summary")
@@ -676,19 +827,10 @@ with tab4:
         )
 
         st.dataframe(
-            geo_kpi.sort_values('total_revenue', ascending=False),
+            geo_kpi,
             use_container_width=True
         )
 
-        # Business Insight (Auto-generated)
-        top_revenue_state = geo_summary.loc[
-            geo_summary['total_revenue'].idxmax()
-        ]
-
-        top_order_state = geo_summary.loc[
-            geo_summary['total_orders'].idxmax()
-        ]
-
 
     # GEOGRAPHIC INSIGHTS
     st.markdown("### Key Insights")
@@ -701,9 +843,7 @@ with tab4:
     geo_summary['order_pct'] = geo_summary['total_orders'] / total_orders * 100
 
     # Revenue Dominant Region
-    top_revenue_state = geo_summary.sort_values(
-        'total_revenue', ascending=False
-    ).iloc[0]
+    top_revenue_state = geo_summary.loc[geo_summary['total_revenue'].idxmax()]
 
     st.success(
         f"**Revenue Stronghold**: "
@@ -714,9 +854,7 @@ with tab4:
     )
 
     # High Volume Region
-    top_order_state = geo_summary.sort_values(
-        'total_orders', ascending=False
-    ).iloc[0]
+    top_order_state = geo_summary.loc[geo_summary['total_orders'].idxmax()]
 
     st.info(
         f"**Transaction Hotspot**: "
@@ -731,9 +869,7 @@ with tab4:
         geo_summary['total_revenue'] / geo_summary['total_orders']
     )
 
-    high_value_state = geo_summary.sort_values(
-        'revenue_per_order', ascending=False
-    ).iloc[0]
+    high_value_state = geo_summary.loc[geo_summary['revenue_per_order'].idxmax()]
 
     st.warning(
         f"**Behavioral Gap Across Regions**: "
@@ -0,0 +1,104 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# PATH CONFIG
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+ORDERS_FULL_PATH = os.path.join(DATA_DIR, "orders_full.parquet")
+
+# CSV sumber untuk orders_full
+DATASETS = {
+    "customers": "customers_dataset.csv",
+    "orders": "orders_dataset.csv",
+    "order_items": "order_items_dataset.csv",
+    "products": "products_dataset.csv",
+}
+
+# Column types yang di-cast sebelum merge
+COLUMN_TYPES = {
+    "order_purchase_timestamp": pa.timestamp("ns"),
+    "customer_state": pa.dictionary(pa.int32(), pa.string()),
+    "product_category_name": pa.dictionary(pa.int32(), pa.string()),
+}
+
+# Kolom orders_full yang benar-benar dipakai app.py
+DASHBOARD_COLUMNS = [
+    "order_purchase_timestamp",
+    "order_id",
+    "customer_unique_id",
+    "customer_state",
+    "product_id",
+    "product_category_name",
+    "price",
+    "revenue",
+]
+
+
+def load_dataset(csv_file):
+    df = pd.read_csv(os.path.join(DATA_DIR, csv_file))
+
+    if "order_purchase_timestamp" in df.columns:
+        df["order_purchase_timestamp"] = pd.to_datetime(df["order_purchase_timestamp"])
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    for column, dtype in COLUMN_TYPES.items():
+        if column in table.column_names:
+            idx = table.schema.get_field_index(column)
+            table = table.set_column(idx, column, table[column].cast(dtype))
+
+    return table.to_pandas()
+
+
+def build_orders_full():
+    customers = load_dataset(DATASETS["customers"])
+    orders = load_dataset(DATASETS["orders"])
+    order_items = load_dataset(DATASETS["order_items"])
+    products = load_dataset(DATASETS["products"])
+
+    # BUILD MASTER DATASET
+    orders_full = (
+        orders
+        .merge(customers, on='customer_id', how='left')
+        .merge(order_items, on='order_id', how='left')
+        .merge(products, on='product_id', how='left')
+    )
+
+    # Revenue definition
+    orders_full['revenue'] = orders_full['price']
+
+    # Hanya kolom yang dipakai dashboard
+    orders_full = orders_full[DASHBOARD_COLUMNS]
+
+    # Diurutkan per waktu pembelian agar filter periode bisa memangkas row group
+    orders_full = orders_full.sort_values('order_purchase_timestamp', kind='stable')
+
+    table = pa.Table.from_pandas(orders_full, preserve_index=False)
+    pq.write_table(
+        table,
+        ORDERS_FULL_PATH,
+        row_group_size=10_000
+    )
+
+
+def is_orders_full_stale():
+    # Perlu dibangun ulang jika file belum ada atau ada CSV sumber yang lebih baru
+    if not os.path.exists(ORDERS_FULL_PATH):
+        return True
+
+    built_at = os.path.getmtime(ORDERS_FULL_PATH)
+    return any(
+        os.path.getmtime(os.path.join(DATA_DIR, csv_file)) > built_at
+        for csv_file in DATASETS.values()
+    )
+
+
+def main():
+    build_orders_full()
+    print(f"orders_full ditulis ke {ORDERS_FULL_PATH}")
+
+
+if __name__ == "__main__":
+    main()